@@ -1,20 +1,33 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import io
 import os
-import uuid
-from datetime import datetime, timedelta
-from typing import List, Optional
-
+import secrets
+import threading
+import time
+import types
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional
+
+import bcrypt
 import boto3
-from fastapi import Depends, FastAPI, HTTPException, status
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from botocore.config import Config
+from cachetools import TTLCache
+from fastapi import BackgroundTasks, Body, Depends, FastAPI, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from reportlab import rl_config
 from reportlab.lib.pagesizes import LETTER
 from reportlab.pdfgen import canvas
+from sqlalchemy import cast, delete, exists, insert, lambda_stmt, literal, select, union_all, update
 from sqlalchemy.orm import Session
 
 from db import Base, SessionLocal, engine
@@ -35,12 +48,16 @@ from models import (
 # App setup
 # ----------------------------
 app = FastAPI(title="JobFlow API")
-Base.metadata.create_all(bind=engine)
 
 def _env(name: str, default: str) -> str:
     val = os.getenv(name)
     return val if val is not None and val.strip() else default
 
+# Schema DDL is a deploy step, not something every worker should do at import.
+# Local SQLite keeps the old create-on-boot behaviour unless RUN_CREATE_ALL=0.
+if _env("RUN_CREATE_ALL", "1" if engine.dialect.name == "sqlite" else "0") == "1":
+    Base.metadata.create_all(bind=engine)
+
 def _parse_cors_origins(raw: str) -> list[str]:
     raw = raw.strip()
     if raw == "*":
@@ -53,18 +70,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Flate-compressed PDF streams are written as raw binary; the default ASCII85 wrapper
+# only exists for 7-bit transports and inflates every stream by ~25%.
+rl_config.useA85 = 0
+
 # ----------------------------
 # Auth config
 # ----------------------------
 SECRET_KEY = _env("SECRET_KEY", "CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
 ALGORITHM = _env("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_DAYS = int(_env("ACCESS_TOKEN_EXPIRE_DAYS", "30"))
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_TOKEN_TTL_SECONDS = ACCESS_TOKEN_EXPIRE_DAYS * 86400
+
+# New hashes are argon2id; bcrypt hashes from older accounts still verify and get
+# upgraded on the next successful login.
+_argon2 = PasswordHasher(
+    time_cost=int(_env("ARGON2_TIME_COST", "2")),
+    memory_cost=int(_env("ARGON2_MEMORY_COST", "19456")),
+    parallelism=int(_env("ARGON2_PARALLELISM", "1")),
+)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+# Successful password checks, keyed by sha256(password|hash) so raw passwords are never held.
+# A password change yields a new hash, so stale entries simply stop matching.
+_pw_cache: TTLCache = TTLCache(maxsize=2048, ttl=60)
+_pw_cache_lock = threading.Lock()
+
+# Decoded tokens, keyed by sha256(token) -> (user_id, exp). The TTL only bounds how long a
+# token is accepted without a fresh decode; this is not a revocation mechanism.
+_jwt_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_jwt_cache_lock = threading.Lock()
+
 # ----------------------------
 # DB dependency
 # ----------------------------
@@ -79,96 +119,222 @@ def get_db():
 # Helpers
 # ----------------------------
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _argon2.hash(password)
+
+def _check_password(password: str, password_hash: str) -> bool:
+    if password_hash.startswith("$argon2"):
+        try:
+            return _argon2.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    if password_hash.startswith(_BCRYPT_PREFIXES):
+        try:
+            return bcrypt.checkpw(password.encode(), password_hash.encode())
+        except ValueError:
+            return False
+    # Unrecognised hash format: a failed login, not a server error
+    return False
+
+def _password_needs_update(password_hash: str) -> bool:
+    if not password_hash.startswith("$argon2"):
+        return True
+    return _argon2.check_needs_rehash(password_hash)
+
+def verify_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    # Returns (ok, new_hash); new_hash is set when the stored hash should be upgraded
+    k = hashlib.sha256(password.encode() + b"|" + password_hash.encode()).digest()
+    with _pw_cache_lock:
+        ok = bool(_pw_cache.get(k))
+
+    if not ok:
+        ok = _check_password(password, password_hash)
+        # Only cache successes so bad-password floods can't churn the cache
+        if ok:
+            with _pw_cache_lock:
+                _pw_cache[k] = True
+
+    new_hash = hash_password(password) if ok and _password_needs_update(password_hash) else None
+    return ok, new_hash
+
+def authenticate_user(db: Session, email: str, password: str) -> User:
+    user = db.query(User).filter(User.email == email.lower()).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
+    ok, new_hash = verify_password(password, user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    # Transparently move old hashes to the current algorithm and parameters
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    return user
 
 def create_access_token(user_id: int) -> str:
-    expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    payload = {"sub": str(user_id), "exp": expire}
+    payload = {"sub": str(user_id), "exp": int(time.time()) + _TOKEN_TTL_SECONDS}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+def decode_token_user_id(token: str) -> int:
+    h = hashlib.sha256(token.encode()).digest()
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(h)
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
     except (JWTError, ValueError, TypeError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _jwt_cache_lock:
+            _jwt_cache[h] = (user_id, exp)
+    return user_id
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    user_id = decode_token_user_id(token)
+
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 def ensure_profile_and_business(db: Session, user: User) -> tuple[UserProfile, Business]:
+    created = False
     profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
     if not profile:
         profile = UserProfile(user_id=user.id, timezone=_env("DEFAULT_TIMEZONE", "America/New_York"))
         db.add(profile)
+        created = True
 
     biz = db.query(Business).filter(Business.owner_user_id == user.id).first()
     if not biz:
         name = (user.full_name or "").strip() or "My Business"
         biz = Business(owner_user_id=user.id, name=name)
         db.add(biz)
+        created = True
 
-    db.commit()
-    db.refresh(profile)
-    db.refresh(biz)
+    if created:
+        db.commit()
     return profile, biz
 
-def current_business(db: Session, user: User) -> Business:
-    _, biz = ensure_profile_and_business(db, user)
+def current_business_fast(db: Session, user: User) -> Business:
+    # Single SELECT on the hot path; the ensure/write path only runs for legacy users
+    biz = db.query(Business).filter(Business.owner_user_id == user.id).first()
+    if biz is None:
+        _, biz = ensure_profile_and_business(db, user)
     return biz
 
+def get_owned(db: Session, model, pk: int, biz: Business, user: Optional[User] = None):
+    # PK lookups go through the identity map; tenancy is checked on the loaded row
+    obj = db.get(model, pk)
+    if obj is None or obj.business_id != biz.id:
+        return None
+    if user is not None and obj.user_id != user.id:
+        return None
+    return obj
+
+@functools.lru_cache(maxsize=None)
+def projection(model, out: type[BaseModel]) -> tuple:
+    # Columns backing the response schema; never SELECT * for listings
+    return tuple(getattr(model, f) for f in out.model_fields)
+
+def set_next_cursor(response: Response, rows, limit: Optional[int]) -> None:
+    # A full page may have more behind it; pass this value back as before_id for the next one
+    if limit is not None and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+def list_page(
+    db: Session,
+    response: Response,
+    model,
+    out: type[BaseModel],
+    *criteria,
+    limit: Optional[int],
+    before_id: Optional[int],
+):
+    # Newest first, selecting only the columns the response schema exposes. Paging is
+    # opt-in: without limit the whole list comes back, as clients that sum totals expect.
+    stmt = select(*projection(model, out)).where(*criteria)
+    if before_id is not None:
+        stmt = stmt.where(model.id < before_id)
+    stmt = stmt.order_by(model.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).all()
+    set_next_cursor(response, rows, limit)
+    return rows
+
+def current_business_dep(db: Session = Depends(get_db), me: User = Depends(get_current_user)) -> Business:
+    return current_business_fast(db, me)
+
+def current_business_id_dep(db: Session = Depends(get_db), me: User = Depends(get_current_user)) -> int:
+    # For routes that only scope by business: fetch just the id column
+    biz_id = db.query(Business.id).filter(Business.owner_user_id == me.id).scalar()
+    if biz_id is None:
+        biz_id = current_business_fast(db, me).id
+    return biz_id
+
 # ----------------------------
 # S3 helpers (S3-compatible: AWS S3 / Cloudflare R2 / Backblaze B2)
 # ----------------------------
+def _load_s3_config() -> types.SimpleNamespace:
+    base = os.getenv("S3_PUBLIC_BASE_URL")
+    return types.SimpleNamespace(
+        bucket=os.getenv("S3_BUCKET"),
+        endpoint_url=os.getenv("S3_ENDPOINT_URL"),  # set for R2/B2; omit for AWS
+        region=os.getenv("S3_REGION", "us-east-1"),
+        public_base_url=base.strip().rstrip("/") if base and base.strip() else None,
+        presign_expires=int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", "900")),
+    )
+
+# Read once at import; URL building runs per receipt/PDF and the env doesn't change
+_S3_CFG = _load_s3_config()
+
+# boto3 clients are thread-safe and the S3 env is fixed for the process, so build it once.
+# Failed lookups raise and are therefore never cached.
+@functools.lru_cache(maxsize=1)
 def s3_client():
     access = os.getenv("S3_ACCESS_KEY_ID")
     secret = os.getenv("S3_SECRET_ACCESS_KEY")
-    bucket = os.getenv("S3_BUCKET")
-    if not (access and secret and bucket):
+    if not (access and secret and _S3_CFG.bucket):
         raise HTTPException(status_code=500, detail="S3 not configured (missing S3_ACCESS_KEY_ID/S3_SECRET_ACCESS_KEY/S3_BUCKET)")
 
-    endpoint_url = os.getenv("S3_ENDPOINT_URL")  # set for R2/B2; omit for AWS
-    region = os.getenv("S3_REGION", "us-east-1")
-
     return boto3.client(
         "s3",
         aws_access_key_id=access,
         aws_secret_access_key=secret,
-        region_name=region,
-        endpoint_url=endpoint_url,
+        region_name=_S3_CFG.region,
+        endpoint_url=_S3_CFG.endpoint_url,
+        config=Config(signature_version="s3v4", max_pool_connections=50),
     )
 
 def s3_public_base_url() -> Optional[str]:
-    v = os.getenv("S3_PUBLIC_BASE_URL")
-    return v.strip().rstrip("/") if v and v.strip() else None
+    return _S3_CFG.public_base_url
 
 def s3_object_public_url(bucket: str, key: str) -> str:
-    base = s3_public_base_url()
-    if base:
-        return f"{base}/{key}"
-    endpoint_url = os.getenv("S3_ENDPOINT_URL")
-    region = os.getenv("S3_REGION", "us-east-1")
-    if endpoint_url:
+    if _S3_CFG.public_base_url:
+        return f"{_S3_CFG.public_base_url}/{key}"
+    if _S3_CFG.endpoint_url:
         # many S3-compatible providers expose direct URLs; base URL is preferred
-        return f"{endpoint_url.rstrip('/')}/{bucket}/{key}"
-    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+        return f"{_S3_CFG.endpoint_url.rstrip('/')}/{bucket}/{key}"
+    return f"https://{bucket}.s3.{_S3_CFG.region}.amazonaws.com/{key}"
 
 def s3_presign_put(bucket: str, key: str, content_type: str) -> str:
     client = s3_client()
     return client.generate_presigned_url(
         ClientMethod="put_object",
         Params={"Bucket": bucket, "Key": key, "ContentType": content_type},
-        ExpiresIn=int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", "900")),
+        ExpiresIn=_S3_CFG.presign_expires,
     )
 
-def s3_put_bytes(bucket: str, key: str, content_type: str, data: bytes) -> str:
+def s3_put_fileobj(bucket: str, key: str, content_type: str, fileobj: BinaryIO) -> str:
+    # upload_fileobj reads in chunks and switches to multipart for large bodies
     client = s3_client()
-    client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+    client.upload_fileobj(fileobj, bucket, key, ExtraArgs={"ContentType": content_type})
     return s3_object_public_url(bucket, key)
 
 # ----------------------------
@@ -307,6 +473,7 @@ class InvoiceOut(_ORM):
     due_date: Optional[str] = None
     invoice_number: Optional[str] = None
     pdf_url: Optional[str] = None
+    pdf_status: Optional[str] = None
     created_at: datetime
 
 class MileageCreateIn(BaseModel):
@@ -356,6 +523,9 @@ class ReceiptPresignOut(BaseModel):
     upload_url: str
     file_url: str
 
+class ReceiptPresignBatchIn(BaseModel):
+    files: List[ReceiptPresignIn] = Field(..., min_length=1, max_length=50)
+
 class ReceiptCreateIn(BaseModel):
     key: Optional[str] = None
     file_url: str
@@ -378,6 +548,26 @@ class ReceiptOut(_ORM):
     vendor_id: Optional[int] = None
     created_at: datetime
 
+# Fields the update handlers may copy onto ORM rows
+_BUSINESS_UPDATE_FIELDS = frozenset({
+    "name", "email", "phone", "address_line1", "address_line2", "city", "state", "postal_code",
+    "country", "ein", "logo_url", "invoice_prefix", "next_invoice_number", "default_terms",
+})
+_CLIENT_UPDATE_FIELDS = frozenset({"name", "email", "phone", "address", "notes"})
+_VENDOR_UPDATE_FIELDS = frozenset({"name", "email", "phone", "notes", "default_category"})
+_INVOICE_UPDATE_FIELDS = frozenset({"amount", "status", "note", "due_date"})
+_EXPENSE_UPDATE_FIELDS = frozenset({"amount", "category", "category_code", "note"})
+
+def touch_updated_at(obj) -> None:
+    # updated_at has no onupdate trigger; only user-facing edits bump it, so internal
+    # writes (e.g. invoice numbering) don't rewrite the column
+    obj.updated_at = datetime.now(timezone.utc)
+
+def apply_set_fields(obj, data: BaseModel, allowed: frozenset[str]) -> None:
+    # Copy only fields the client actually sent, without building a model_dump() dict
+    for field in data.__pydantic_fields_set__ & allowed:
+        setattr(obj, field, getattr(data, field))
+
 # ----------------------------
 # Health
 # ----------------------------
@@ -401,7 +591,6 @@ def signup(data: AuthSignupIn, db: Session = Depends(get_db)):
     )
     db.add(user)
     db.commit()
-    db.refresh(user)
 
     # Create profile + business (single business per user)
     ensure_profile_and_business(db, user)
@@ -411,9 +600,7 @@ def signup(data: AuthSignupIn, db: Session = Depends(get_db)):
 
 @app.post("/auth/login", response_model=AuthOut)
 def login(data: AuthLoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email.lower()).first()
-    if not user or not verify_password(data.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
+    user = authenticate_user(db, data.email, data.password)
 
     ensure_profile_and_business(db, user)
 
@@ -422,9 +609,7 @@ def login(data: AuthLoginIn, db: Session = Depends(get_db)):
 
 @app.post("/auth/token")
 def token_endpoint(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username.lower()).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
+    user = authenticate_user(db, form_data.username, form_data.password)
 
     ensure_profile_and_business(db, user)
 
@@ -448,57 +633,54 @@ def update_profile(data: UserProfileUpdateIn, db: Session = Depends(get_db), me:
         profile.timezone = data.timezone
     if data.default_mileage_rate is not None:
         profile.default_mileage_rate = data.default_mileage_rate
+    touch_updated_at(profile)
     db.commit()
-    db.refresh(profile)
     return profile
 
 @app.get("/business", response_model=BusinessOut)
-def get_business(db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+def get_business(biz: Business = Depends(current_business_dep)):
     return biz
 
 @app.put("/business", response_model=BusinessOut)
-def update_business(data: BusinessUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(biz, field, value)
+def update_business(data: BusinessUpdateIn, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
+    apply_set_fields(biz, data, _BUSINESS_UPDATE_FIELDS)
+    touch_updated_at(biz)
     db.commit()
-    db.refresh(biz)
     return biz
 
 # ----------------------------
 # Clients
 # ----------------------------
 @app.get("/clients", response_model=List[ClientOut])
-def list_clients(db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    return db.query(Client).filter(Client.business_id == biz.id).order_by(Client.id.desc()).all()
+def list_clients(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    biz: Business = Depends(current_business_dep),
+):
+    return list_page(db, response, Client, ClientOut, Client.business_id == biz.id, limit=limit, before_id=before_id)
 
 @app.post("/clients", response_model=ClientOut)
-def create_client(data: ClientCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+def create_client(data: ClientCreateIn, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
     c = Client(business_id=biz.id, **data.model_dump())
     db.add(c)
     db.commit()
-    db.refresh(c)
     return c
 
 @app.put("/clients/{client_id}", response_model=ClientOut)
-def update_client(client_id: int, data: ClientCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    c = db.query(Client).filter(Client.id == client_id, Client.business_id == biz.id).first()
+def update_client(client_id: int, data: ClientCreateIn, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
+    c = get_owned(db, Client, client_id, biz)
     if not c:
         raise HTTPException(status_code=404, detail="Client not found")
-    for k, v in data.model_dump().items():
-        setattr(c, k, v)
+    for field in _CLIENT_UPDATE_FIELDS:
+        setattr(c, field, getattr(data, field))
     db.commit()
-    db.refresh(c)
     return c
 
 @app.delete("/clients/{client_id}")
-def delete_client(client_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    c = db.query(Client).filter(Client.id == client_id, Client.business_id == biz.id).first()
+def delete_client(client_id: int, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
+    c = get_owned(db, Client, client_id, biz)
     if not c:
         raise HTTPException(status_code=404, detail="Client not found")
     db.delete(c)
@@ -509,35 +691,35 @@ def delete_client(client_id: int, db: Session = Depends(get_db), me: User = Depe
 # Vendors
 # ----------------------------
 @app.get("/vendors", response_model=List[VendorOut])
-def list_vendors(db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    return db.query(Vendor).filter(Vendor.business_id == biz.id).order_by(Vendor.id.desc()).all()
+def list_vendors(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    biz: Business = Depends(current_business_dep),
+):
+    return list_page(db, response, Vendor, VendorOut, Vendor.business_id == biz.id, limit=limit, before_id=before_id)
 
 @app.post("/vendors", response_model=VendorOut)
-def create_vendor(data: VendorCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+def create_vendor(data: VendorCreateIn, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
     v = Vendor(business_id=biz.id, **data.model_dump())
     db.add(v)
     db.commit()
-    db.refresh(v)
     return v
 
 @app.put("/vendors/{vendor_id}", response_model=VendorOut)
-def update_vendor(vendor_id: int, data: VendorCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    v = db.query(Vendor).filter(Vendor.id == vendor_id, Vendor.business_id == biz.id).first()
+def update_vendor(vendor_id: int, data: VendorCreateIn, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
+    v = get_owned(db, Vendor, vendor_id, biz)
     if not v:
         raise HTTPException(status_code=404, detail="Vendor not found")
-    for k, val in data.model_dump().items():
-        setattr(v, k, val)
+    for field in _VENDOR_UPDATE_FIELDS:
+        setattr(v, field, getattr(data, field))
     db.commit()
-    db.refresh(v)
     return v
 
 @app.delete("/vendors/{vendor_id}")
-def delete_vendor(vendor_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    v = db.query(Vendor).filter(Vendor.id == vendor_id, Vendor.business_id == biz.id).first()
+def delete_vendor(vendor_id: int, db: Session = Depends(get_db), biz: Business = Depends(current_business_dep)):
+    v = get_owned(db, Vendor, vendor_id, biz)
     if not v:
         raise HTTPException(status_code=404, detail="Vendor not found")
     db.delete(v)
@@ -548,16 +730,27 @@ def delete_vendor(vendor_id: int, db: Session = Depends(get_db), me: User = Depe
 # Jobs
 # ----------------------------
 @app.get("/jobs", response_model=List[JobOut])
-def list_jobs(db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    return db.query(Job).filter(Job.user_id == me.id, Job.business_id == biz.id).order_by(Job.id.desc()).all()
+def list_jobs(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz: Business = Depends(current_business_dep),
+):
+    return list_page(db, response, Job, JobOut, Job.user_id == me.id, Job.business_id == biz.id, limit=limit, before_id=before_id)
 
-@app.post("/jobs", response_model=JobOut)
-def create_job(data: JobCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    job = get_owned(db, Job, job_id, biz, me)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
+@app.post("/jobs", response_model=JobOut)
+def create_job(data: JobCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
     if data.client_id is not None:
-        c = db.query(Client).filter(Client.id == data.client_id, Client.business_id == biz.id).first()
+        c = get_owned(db, Client, data.client_id, biz)
         if not c:
             raise HTTPException(status_code=404, detail="Client not found")
 
@@ -571,18 +764,16 @@ def create_job(data: JobCreateIn, db: Session = Depends(get_db), me: User = Depe
     )
     db.add(job)
     db.commit()
-    db.refresh(job)
     return job
 
 @app.put("/jobs/{job_id}", response_model=JobOut)
-def update_job(job_id: int, data: JobUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    job = db.query(Job).filter(Job.id == job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+def update_job(job_id: int, data: JobUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    job = get_owned(db, Job, job_id, biz, me)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     if data.client_id is not None:
-        c = db.query(Client).filter(Client.id == data.client_id, Client.business_id == biz.id).first()
+        c = get_owned(db, Client, data.client_id, biz)
         if not c:
             raise HTTPException(status_code=404, detail="Client not found")
         job.client_id = data.client_id
@@ -595,13 +786,11 @@ def update_job(job_id: int, data: JobUpdateIn, db: Session = Depends(get_db), me
         job.status = data.status
 
     db.commit()
-    db.refresh(job)
     return job
 
 @app.delete("/jobs/{job_id}")
-def delete_job(job_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    job = db.query(Job).filter(Job.id == job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+def delete_job(job_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    job = get_owned(db, Job, job_id, biz, me)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     db.delete(job)
@@ -612,31 +801,46 @@ def delete_job(job_id: int, db: Session = Depends(get_db), me: User = Depends(ge
 # Invoices
 # ----------------------------
 @app.get("/invoices", response_model=List[InvoiceOut])
-def list_invoices(job_id: Optional[int] = None, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    q = db.query(Invoice).filter(Invoice.user_id == me.id, Invoice.business_id == biz.id)
+def list_invoices(
+    response: Response,
+    job_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz: Business = Depends(current_business_dep),
+):
+    criteria = [Invoice.user_id == me.id, Invoice.business_id == biz.id]
     if job_id is not None:
-        q = q.filter(Invoice.job_id == job_id)
-    return q.order_by(Invoice.id.desc()).all()
+        criteria.append(Invoice.job_id == job_id)
+    return list_page(db, response, Invoice, InvoiceOut, *criteria, limit=limit, before_id=before_id)
 
-def allocate_invoice_number(db: Session, biz: Business) -> str:
-    prefix = biz.invoice_prefix or "INV-"
-    number = biz.next_invoice_number or 1
-    biz.next_invoice_number = number + 1
-    db.commit()
-    db.refresh(biz)
-    return f"{prefix}{number:04d}"
+@app.get("/invoices/{invoice_id}", response_model=InvoiceOut)
+def get_invoice(invoice_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    inv = get_owned(db, Invoice, invoice_id, biz, me)
+    if not inv:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return inv
 
-@app.post("/invoices", response_model=InvoiceOut)
-def create_invoice(data: InvoiceCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+def allocate_invoice_number(db: Session, biz_id: int) -> str:
+    # Atomic increment in one statement; the row stays locked until the caller commits.
+    # The prefix comes back in the same RETURNING row, so no Business object is needed.
+    number, prefix = db.execute(
+        update(Business)
+        .where(Business.id == biz_id)
+        .values(next_invoice_number=Business.next_invoice_number + 1)
+        .returning(Business.next_invoice_number, Business.invoice_prefix)
+    ).one()
+    return f"{prefix or 'INV-'}{number - 1:04d}"
 
+@app.post("/invoices", response_model=InvoiceOut)
+def create_invoice(data: InvoiceCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
     if data.job_id is not None:
-        job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+        job = get_owned(db, Job, data.job_id, biz, me)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found for this user")
 
-    inv_num = allocate_invoice_number(db, biz)
+    inv_num = allocate_invoice_number(db, biz.id)
     inv = Invoice(
         user_id=me.id,
         business_id=biz.id,
@@ -649,117 +853,144 @@ def create_invoice(data: InvoiceCreateIn, db: Session = Depends(get_db), me: Use
     )
     db.add(inv)
     db.commit()
-    db.refresh(inv)
     return inv
 
 @app.put("/invoices/{invoice_id}", response_model=InvoiceOut)
-def update_invoice(invoice_id: int, data: InvoiceUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.user_id == me.id, Invoice.business_id == biz.id).first()
+def update_invoice(invoice_id: int, data: InvoiceUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    inv = get_owned(db, Invoice, invoice_id, biz, me)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
     if data.job_id is not None:
         if data.job_id:
-            job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+            job = get_owned(db, Job, data.job_id, biz, me)
             if not job:
                 raise HTTPException(status_code=404, detail="Job not found")
         inv.job_id = data.job_id
 
-    for k, v in data.model_dump(exclude_unset=True).items():
-        if k == "job_id":
-            continue
-        setattr(inv, k, v)
+    apply_set_fields(inv, data, _INVOICE_UPDATE_FIELDS)
 
     db.commit()
-    db.refresh(inv)
     return inv
 
 @app.delete("/invoices/{invoice_id}")
-def delete_invoice(invoice_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.user_id == me.id, Invoice.business_id == biz.id).first()
+def delete_invoice(invoice_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    inv = get_owned(db, Invoice, invoice_id, biz, me)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
     db.delete(inv)
     db.commit()
     return {"ok": True}
 
+def set_invoice_pdf(invoice_id: int, pdf_url: Optional[str], pdf_status: str) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(Invoice).where(Invoice.id == invoice_id).values(pdf_url=pdf_url, pdf_status=pdf_status))
+        db.commit()
+    finally:
+        db.close()
+
+def upload_invoice_pdf(invoice_id: int, bucket: str, key: str, pdf: BinaryIO) -> None:
+    # Runs after the response is sent, so it records the outcome with its own session
+    try:
+        url = s3_put_fileobj(bucket, key, "application/pdf", pdf)
+    except Exception:
+        set_invoice_pdf(invoice_id, None, "failed")
+        raise
+    set_invoice_pdf(invoice_id, url, "ready")
+
 @app.post("/invoices/{invoice_id}/pdf", response_model=InvoiceOut)
-def generate_invoice_pdf(invoice_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.user_id == me.id, Invoice.business_id == biz.id).first()
+def generate_invoice_pdf(
+    invoice_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz: Business = Depends(current_business_dep),
+):
+    inv = get_owned(db, Invoice, invoice_id, biz, me)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
-    # Build PDF
+    # Build PDF: every line goes through one text object, switching fonts only when needed
     buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=LETTER)
+    c = canvas.Canvas(buf, pagesize=LETTER, pageCompression=1)
     width, height = LETTER
 
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(50, height - 60, biz.name or "Business")
-
-    c.setFont("Helvetica", 11)
+    lines = [("Helvetica-Bold", 18, height - 60, biz.name or "Business")]
     addr = " ".join([x for x in [biz.address_line1, biz.address_line2, biz.city, biz.state, biz.postal_code] if x])
     if addr:
-        c.drawString(50, height - 80, addr)
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, height - 120, f"Invoice {inv.invoice_number or inv.id}")
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, height - 150, f"Amount: ${inv.amount:.2f}")
-    c.drawString(50, height - 170, f"Status: {inv.status or ''}")
+        lines.append(("Helvetica", 11, height - 80, addr))
+    lines.append(("Helvetica-Bold", 14, height - 120, f"Invoice {inv.invoice_number or inv.id}"))
+    lines.append(("Helvetica", 12, height - 150, f"Amount: ${inv.amount:.2f}"))
+    lines.append(("Helvetica", 12, height - 170, f"Status: {inv.status or ''}"))
     if inv.due_date:
-        c.drawString(50, height - 190, f"Due date: {inv.due_date}")
-
+        lines.append(("Helvetica", 12, height - 190, f"Due date: {inv.due_date}"))
     if inv.note:
-        c.setFont("Helvetica", 11)
-        c.drawString(50, height - 220, "Note:")
-        text = c.beginText(50, height - 240)
-        text.setFont("Helvetica", 11)
-        for line in str(inv.note).splitlines()[:10]:
-            text.textLine(line)
-        c.drawText(text)
-
-    c.setFont("Helvetica", 10)
-    c.drawString(50, 60, biz.default_terms or "Due on receipt")
+        lines.append(("Helvetica", 11, height - 220, "Note:"))
+        for i, line in enumerate(str(inv.note).splitlines()[:10]):
+            lines.append(("Helvetica", 11, height - 240 - i * 11 * 1.2, line))
+    lines.append(("Helvetica", 10, 60, biz.default_terms or "Due on receipt"))
+
+    text = c.beginText()
+    font = None
+    for name, size, y, line in lines:
+        if font != (name, size):
+            font = (name, size)
+            text.setFont(name, size)
+        text.setTextOrigin(50, y)
+        text.textOut(line)
+    c.drawText(text)
 
     c.showPage()
     c.save()
-    pdf_bytes = buf.getvalue()
-
-    bucket = os.getenv("S3_BUCKET")
-    key = f"business_{biz.id}/invoices/{inv.invoice_number or inv.id}_{uuid.uuid4().hex}.pdf"
-    url = s3_put_bytes(bucket, key, "application/pdf", pdf_bytes)
-    inv.pdf_url = url
+    # Hand the buffer itself to the uploader instead of copying it out with getvalue()
+    buf.seek(0)
+
+    # Fail fast on missing S3 config; the upload itself happens after the response. Clients
+    # poll the invoice until pdf_status leaves "pending" (pdf_url is set once it's "ready").
+    s3_client()
+    bucket = _S3_CFG.bucket
+    key = f"business_{biz.id}/invoices/{inv.invoice_number or inv.id}_{secrets.token_hex(16)}.pdf"
+    inv.pdf_url = None
+    inv.pdf_status = "pending"
     db.commit()
-    db.refresh(inv)
+    background_tasks.add_task(upload_invoice_pdf, inv.id, bucket, key, buf)
     return inv
 
 # ----------------------------
 # Expenses
 # ----------------------------
 @app.get("/expenses", response_model=List[ExpenseOut])
-def list_expenses(job_id: Optional[int] = None, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    q = db.query(Expense).filter(Expense.user_id == me.id, Expense.business_id == biz.id)
+def list_expenses(
+    response: Response,
+    job_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz: Business = Depends(current_business_dep),
+):
+    criteria = [Expense.user_id == me.id, Expense.business_id == biz.id]
     if job_id is not None:
-        q = q.filter(Expense.job_id == job_id)
-    return q.order_by(Expense.id.desc()).all()
+        criteria.append(Expense.job_id == job_id)
+    return list_page(db, response, Expense, ExpenseOut, *criteria, limit=limit, before_id=before_id)
 
-@app.post("/expenses", response_model=ExpenseOut)
-def create_expense(data: ExpenseCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+@app.get("/expenses/{expense_id}", response_model=ExpenseOut)
+def get_expense(expense_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    exp = get_owned(db, Expense, expense_id, biz, me)
+    if not exp:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return exp
 
+@app.post("/expenses", response_model=ExpenseOut)
+def create_expense(data: ExpenseCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
     if data.job_id is not None:
-        job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+        job = get_owned(db, Job, data.job_id, biz, me)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found for this user")
 
     if data.vendor_id is not None:
-        vend = db.query(Vendor).filter(Vendor.id == data.vendor_id, Vendor.business_id == biz.id).first()
+        vend = get_owned(db, Vendor, data.vendor_id, biz)
         if not vend:
             raise HTTPException(status_code=404, detail="Vendor not found")
 
@@ -775,43 +1006,36 @@ def create_expense(data: ExpenseCreateIn, db: Session = Depends(get_db), me: Use
     )
     db.add(exp)
     db.commit()
-    db.refresh(exp)
     return exp
 
 @app.put("/expenses/{expense_id}", response_model=ExpenseOut)
-def update_expense(expense_id: int, data: ExpenseUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    exp = db.query(Expense).filter(Expense.id == expense_id, Expense.user_id == me.id, Expense.business_id == biz.id).first()
+def update_expense(expense_id: int, data: ExpenseUpdateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    exp = get_owned(db, Expense, expense_id, biz, me)
     if not exp:
         raise HTTPException(status_code=404, detail="Expense not found")
 
     if data.job_id is not None:
         if data.job_id:
-            job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+            job = get_owned(db, Job, data.job_id, biz, me)
             if not job:
                 raise HTTPException(status_code=404, detail="Job not found")
         exp.job_id = data.job_id
 
     if data.vendor_id is not None:
         if data.vendor_id:
-            vend = db.query(Vendor).filter(Vendor.id == data.vendor_id, Vendor.business_id == biz.id).first()
+            vend = get_owned(db, Vendor, data.vendor_id, biz)
             if not vend:
                 raise HTTPException(status_code=404, detail="Vendor not found")
         exp.vendor_id = data.vendor_id
 
-    for k, v in data.model_dump(exclude_unset=True).items():
-        if k in {"job_id", "vendor_id"}:
-            continue
-        setattr(exp, k, v)
+    apply_set_fields(exp, data, _EXPENSE_UPDATE_FIELDS)
 
     db.commit()
-    db.refresh(exp)
     return exp
 
 @app.delete("/expenses/{expense_id}")
-def delete_expense(expense_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    exp = db.query(Expense).filter(Expense.id == expense_id, Expense.user_id == me.id, Expense.business_id == biz.id).first()
+def delete_expense(expense_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    exp = get_owned(db, Expense, expense_id, biz, me)
     if not exp:
         raise HTTPException(status_code=404, detail="Expense not found")
     db.delete(exp)
@@ -822,31 +1046,35 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db), me: User = De
 # Mileage
 # ----------------------------
 @app.get("/mileage", response_model=List[MileageOut])
-def list_mileage(job_id: Optional[int] = None, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    q = db.query(Mileage).filter(Mileage.user_id == me.id, Mileage.business_id == biz.id)
+def list_mileage(
+    response: Response,
+    job_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz: Business = Depends(current_business_dep),
+):
+    criteria = [Mileage.user_id == me.id, Mileage.business_id == biz.id]
     if job_id is not None:
-        q = q.filter(Mileage.job_id == job_id)
-    return q.order_by(Mileage.id.desc()).all()
+        criteria.append(Mileage.job_id == job_id)
+    return list_page(db, response, Mileage, MileageOut, *criteria, limit=limit, before_id=before_id)
 
 @app.post("/mileage", response_model=MileageOut)
-def create_mileage(data: MileageCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
+def create_mileage(data: MileageCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
     if data.job_id is not None:
-        job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
+        job = get_owned(db, Job, data.job_id, biz, me)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found for this user")
 
     item = Mileage(user_id=me.id, business_id=biz.id, job_id=data.job_id, miles=data.miles, note=data.note)
     db.add(item)
     db.commit()
-    db.refresh(item)
     return item
 
 @app.delete("/mileage/{mileage_id}")
-def delete_mileage(mileage_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    item = db.query(Mileage).filter(Mileage.id == mileage_id, Mileage.user_id == me.id, Mileage.business_id == biz.id).first()
+def delete_mileage(mileage_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz: Business = Depends(current_business_dep)):
+    item = get_owned(db, Mileage, mileage_id, biz, me)
     if not item:
         raise HTTPException(status_code=404, detail="Mileage not found")
     db.delete(item)
@@ -856,67 +1084,173 @@ def delete_mileage(mileage_id: int, db: Session = Depends(get_db), me: User = De
 # ----------------------------
 # Receipts
 # ----------------------------
-@app.post("/receipts/presign", response_model=ReceiptPresignOut)
-def receipt_presign(data: ReceiptPresignIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-    bucket = os.getenv("S3_BUCKET")
-    safe_name = data.filename.replace("/", "_").replace("\\", "_")
-    key = f"business_{biz.id}/receipts/{uuid.uuid4().hex}_{safe_name}"
-    upload_url = s3_presign_put(bucket, key, data.content_type)
+# Path separators in client filenames would create extra key "directories"
+_KEY_SAFE = str.maketrans({"/": "_", "\\": "_"})
+
+def presign_receipt_upload(biz_id: int, filename: str, content_type: str) -> dict:
+    bucket = _S3_CFG.bucket
+    safe_name = filename.translate(_KEY_SAFE)
+    key = f"business_{biz_id}/receipts/{secrets.token_hex(16)}_{safe_name}"
+    upload_url = s3_presign_put(bucket, key, content_type)
     return {"key": key, "upload_url": upload_url, "file_url": s3_object_public_url(bucket, key)}
 
-@app.post("/receipts", response_model=ReceiptOut)
-def create_receipt(data: ReceiptCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    biz = current_business(db, me)
-
-    if data.job_id is not None:
-        job = db.query(Job).filter(Job.id == data.job_id, Job.user_id == me.id, Job.business_id == biz.id).first()
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-
-    if data.expense_id is not None:
-        exp = db.query(Expense).filter(Expense.id == data.expense_id, Expense.user_id == me.id, Expense.business_id == biz.id).first()
-        if not exp:
-            raise HTTPException(status_code=404, detail="Expense not found")
-
-    if data.vendor_id is not None:
-        vend = db.query(Vendor).filter(Vendor.id == data.vendor_id, Vendor.business_id == biz.id).first()
-        if not vend:
-            raise HTTPException(status_code=404, detail="Vendor not found")
+@app.post("/receipts/presign", response_model=ReceiptPresignOut)
+def receipt_presign(data: ReceiptPresignIn, biz_id: int = Depends(current_business_id_dep)):
+    return presign_receipt_upload(biz_id, data.filename, data.content_type)
+
+@app.post("/receipts/presign_batch", response_model=List[ReceiptPresignOut])
+def receipt_presign_batch(data: ReceiptPresignBatchIn, biz_id: int = Depends(current_business_id_dep)):
+    # Presigning is local HMAC work with the one memoized client, so a loop beats fanning out
+    return [presign_receipt_upload(biz_id, f.filename, f.content_type) for f in data.files]
+
+def check_receipt_refs(
+    db: Session,
+    biz_id: int,
+    me: User,
+    job_id: Optional[int],
+    expense_id: Optional[int],
+    vendor_id: Optional[int],
+) -> None:
+    # All ownership checks in one round trip: each branch yields its kind only if the row is ours
+    branches = []
+    if job_id is not None:
+        branches.append(
+            select(literal("job").label("kind"), Job.id.label("id"))
+            .where(Job.id == job_id, Job.user_id == me.id, Job.business_id == biz_id)
+        )
+    if expense_id is not None:
+        branches.append(
+            select(literal("expense").label("kind"), Expense.id.label("id"))
+            .where(Expense.id == expense_id, Expense.user_id == me.id, Expense.business_id == biz_id)
+        )
+    if vendor_id is not None:
+        branches.append(
+            select(literal("vendor").label("kind"), Vendor.id.label("id"))
+            .where(Vendor.id == vendor_id, Vendor.business_id == biz_id)
+        )
+    if not branches:
+        return
+
+    stmt = branches[0] if len(branches) == 1 else union_all(*branches)
+    found = {kind for kind, _ in db.execute(stmt)}
+    if job_id is not None and "job" not in found:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if expense_id is not None and "expense" not in found:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    if vendor_id is not None and "vendor" not in found:
+        raise HTTPException(status_code=404, detail="Vendor not found")
 
-    r = Receipt(
-        business_id=biz.id,
-        key=data.key,
-        file_url=data.file_url,
-        content_type=data.content_type,
-        original_filename=data.original_filename,
-        size_bytes=data.size_bytes,
-        job_id=data.job_id,
-        expense_id=data.expense_id,
-        vendor_id=data.vendor_id,
+def insert_receipts(db: Session, rows: list[dict]) -> list[dict]:
+    # One multi-VALUES INSERT; RETURNING supplies id/created_at so no refresh is needed
+    result = db.execute(
+        insert(Receipt).returning(Receipt.id, Receipt.created_at, sort_by_parameter_order=True),
+        rows,
     )
-    db.add(r)
+    return [{**row, "id": ret.id, "created_at": ret.created_at} for row, ret in zip(rows, result)]
+
+def insert_receipt_if_owned(db: Session, biz_id: int, me: User, row: dict) -> Optional[dict]:
+    # INSERT ... SELECT ... WHERE EXISTS(...): validation and write in one round trip.
+    # Returns None when any referenced job/expense/vendor isn't ours.
+    guards = []
+    if row["job_id"] is not None:
+        guards.append(exists().where(Job.id == row["job_id"], Job.user_id == me.id, Job.business_id == biz_id))
+    if row["expense_id"] is not None:
+        guards.append(
+            exists().where(Expense.id == row["expense_id"], Expense.user_id == me.id, Expense.business_id == biz_id)
+        )
+    if row["vendor_id"] is not None:
+        guards.append(exists().where(Vendor.id == row["vendor_id"], Vendor.business_id == biz_id))
+
+    cols = list(row)
+    # Explicit casts so Postgres can type the bare parameters in the SELECT list
+    values = select(*[cast(literal(row[c]), Receipt.__table__.c[c].type) for c in cols]).where(*guards)
+    ret = db.execute(
+        insert(Receipt).from_select(cols, values).returning(Receipt.id, Receipt.created_at)
+    ).first()
+    if ret is None:
+        return None
+    return {**row, "id": ret.id, "created_at": ret.created_at}
+
+@app.post("/receipts", response_model=ReceiptOut)
+def create_receipt(data: ReceiptCreateIn, db: Session = Depends(get_db), me: User = Depends(get_current_user), biz_id: int = Depends(current_business_id_dep)):
+    r = insert_receipt_if_owned(db, biz_id, me, {"business_id": biz_id, "user_id": me.id, **data.model_dump()})
+    if r is None:
+        # Rare path: find out which reference failed so the 404 says which one
+        check_receipt_refs(db, biz_id, me, data.job_id, data.expense_id, data.vendor_id)
+        raise HTTPException(status_code=404, detail="Not found")
     db.commit()
-    db.refresh(r)
     return r
 
-@app.get("/receipts", response_model=List[ReceiptOut])
+def missing_owned_ids(db: Session, model, ids: set[int], biz_id: int, user_id: Optional[int] = None) -> list[int]:
+    if not ids:
+        return []
+    stmt = select(model.id).where(model.id.in_(ids), model.business_id == biz_id)
+    if user_id is not None:
+        stmt = stmt.where(model.user_id == user_id)
+    return sorted(ids - set(db.scalars(stmt)))
+
+@app.post("/receipts/batch", response_model=List[ReceiptOut])
+def create_receipts_batch(
+    data: List[ReceiptCreateIn] = Body(..., min_length=1, max_length=100),
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+    biz_id: int = Depends(current_business_id_dep),
+):
+    # One IN-query per referenced kind, then a single multi-row INSERT and one commit
+    checks = [
+        (Job, "job_id", me.id, "Job"),
+        (Expense, "expense_id", me.id, "Expense"),
+        (Vendor, "vendor_id", None, "Vendor"),
+    ]
+    for model, field, user_id, label in checks:
+        ids = {getattr(r, field) for r in data if getattr(r, field) is not None}
+        missing = missing_owned_ids(db, model, ids, biz_id, user_id)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"{label} not found: {missing}")
+
+    rows = insert_receipts(db, [{"business_id": biz_id, "user_id": me.id, **r.model_dump()} for r in data])
+    db.commit()
+    return rows
+
+class UTCZJSONResponse(ORJSONResponse):
+    # Write UTC datetimes as "...Z" like pydantic does on every other endpoint
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+@app.get("/receipts", response_model=List[ReceiptOut], response_class=UTCZJSONResponse)
 def list_receipts(
     job_id: Optional[int] = None,
     expense_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db),
     me: User = Depends(get_current_user),
 ):
-    biz = current_business(db, me)
-    q = db.query(Receipt).filter(Receipt.business_id == biz.id)
+    # Receipts carry their owner, so no business lookup is needed to scope the listing.
+    # Same keyset page as list_page, but as a lambda statement: each filter branch is cached
+    # by code location and request values become bind parameters, so repeat calls skip
+    # building and cache-keying the select.
+    user_id = me.id
+    stmt = lambda_stmt(lambda: select(*projection(Receipt, ReceiptOut)).where(Receipt.user_id == user_id))
     if job_id is not None:
-        q = q.filter(Receipt.job_id == job_id)
+        stmt += lambda s: s.where(Receipt.job_id == job_id)
     if expense_id is not None:
-        q = q.filter(Receipt.expense_id == expense_id)
-    return q.order_by(Receipt.id.desc()).all()
+        stmt += lambda s: s.where(Receipt.expense_id == expense_id)
+    if before_id is not None:
+        stmt += lambda s: s.where(Receipt.id < before_id)
+    stmt += lambda s: s.order_by(Receipt.id.desc())
+    if limit is not None:
+        stmt += lambda s: s.limit(limit)
+    rows = db.execute(stmt).all()
+    # Rows are already exactly ReceiptOut's columns, so skip re-validating them and let orjson
+    # encode directly. Paging works like list_page.
+    resp = UTCZJSONResponse([row._asdict() for row in rows])
+    set_next_cursor(resp, rows, limit)
+    return resp
 
 @app.delete("/users/me")
 def delete_my_account(db: Session = Depends(get_db), me: User = Depends(get_current_user)):
-    db.delete(me)
+    # Single statement; ON DELETE CASCADE removes profile, business and everything under them
+    db.execute(delete(User).where(User.id == me.id))
     db.commit()
     return {"ok": True}
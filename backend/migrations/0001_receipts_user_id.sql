@@ -0,0 +1,17 @@
+-- Denormalize the owning user onto receipts so GET /receipts can filter on it directly.
+-- Run once against databases created before receipts.user_id existed (Postgres or SQLite).
+-- create_all only creates missing tables, so it will not add this column on its own.
+
+ALTER TABLE receipts ADD COLUMN user_id INTEGER REFERENCES users (id) ON DELETE CASCADE;
+
+UPDATE receipts
+SET user_id = (SELECT owner_user_id FROM businesses WHERE businesses.id = receipts.business_id)
+WHERE user_id IS NULL;
+
+CREATE INDEX ix_receipts_user_id ON receipts (user_id, id);
+CREATE INDEX ix_receipts_user_job_id ON receipts (user_id, job_id, id) WHERE job_id IS NOT NULL;
+CREATE INDEX ix_receipts_user_exp_id ON receipts (user_id, expense_id, id) WHERE expense_id IS NOT NULL;
+
+-- Superseded by the user-keyed indexes above; only present where an earlier build ran create_all
+DROP INDEX IF EXISTS ix_receipts_biz_job_id;
+DROP INDEX IF EXISTS ix_receipts_biz_exp_id;
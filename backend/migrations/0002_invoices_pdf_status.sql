@@ -0,0 +1,6 @@
+-- Track the background invoice PDF upload so clients can tell pending, ready and failed apart.
+-- Run once against databases created before invoices.pdf_status existed (Postgres or SQLite).
+
+ALTER TABLE invoices ADD COLUMN pdf_status VARCHAR;
+
+UPDATE invoices SET pdf_status = 'ready' WHERE pdf_url IS NOT NULL;
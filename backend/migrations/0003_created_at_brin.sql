@@ -0,0 +1,13 @@
+-- BRIN indexes on created_at for the append-only tables (Postgres only).
+-- Run once against databases created before these indexes were declared; create_all never adds
+-- indexes to existing tables. CONCURRENTLY avoids blocking writes but cannot run inside a
+-- transaction, so execute these statements one at a time (e.g. psql without a wrapping BEGIN).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invoices_created_brin
+    ON invoices USING BRIN (created_at) WITH (pages_per_range = 32);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_expenses_created_brin
+    ON expenses USING BRIN (created_at) WITH (pages_per_range = 32);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mileage_created_brin
+    ON mileage USING BRIN (created_at) WITH (pages_per_range = 32);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipts_created_brin
+    ON receipts USING BRIN (created_at) WITH (pages_per_range = 32);
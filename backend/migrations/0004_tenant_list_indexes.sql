@@ -0,0 +1,11 @@
+-- Composite indexes backing the tenant-scoped list endpoints (filter by owner, newest id first).
+-- Run once against databases created before these indexes were declared (Postgres or SQLite);
+-- create_all never adds indexes to existing tables. On large Postgres tables, add CONCURRENTLY
+-- and run each statement outside a transaction.
+
+CREATE INDEX IF NOT EXISTS ix_clients_biz_id ON clients (business_id, id);
+CREATE INDEX IF NOT EXISTS ix_vendors_biz_id ON vendors (business_id, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_user_biz_id ON jobs (user_id, business_id, id);
+CREATE INDEX IF NOT EXISTS ix_invoices_user_biz_id ON invoices (user_id, business_id, id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_biz_id ON expenses (user_id, business_id, id);
+CREATE INDEX IF NOT EXISTS ix_mileage_user_biz_id ON mileage (user_id, business_id, id);
@@ -0,0 +1,6 @@
+-- Per-business, time-ordered receipt lookups.
+-- Run once against databases created before this index was declared (Postgres or SQLite);
+-- create_all never adds indexes to existing tables. On a large Postgres table, add CONCURRENTLY
+-- and run it outside a transaction.
+
+CREATE INDEX IF NOT EXISTS ix_receipts_biz_created ON receipts (business_id, created_at DESC);
@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import sqlite3
+from datetime import datetime, timezone
+
 from sqlalchemy import (
     Column,
     Integer,
@@ -9,21 +11,51 @@ from sqlalchemy import (
     Float,
     DateTime,
     ForeignKey,
+    Index,
     func,
     event,
+    text,
 )
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 
 from db import Base
 
 
-# SQLite must have foreign keys enabled for ON DELETE CASCADE to work
+# created_at is filled client-side so freshly inserted rows don't need a refresh SELECT;
+# server_default stays for rows written outside the ORM.
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class UTCDateTime(TypeDecorator):
+    # SQLite keeps no offset, so values read back are naive while the ones set by _utcnow are
+    # aware. Everything stored is UTC; tag it as such so creates and reads serialize alike.
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+
+# SQLite must have foreign keys enabled for ON DELETE CASCADE to work.
+# WAL lets readers run alongside the single writer (a no-op once the file is already in WAL,
+# and :memory: databases simply stay in memory mode); the rest trade durability-on-power-loss
+# (NORMAL sync) and memory for fewer syscalls.
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     if isinstance(dbapi_connection, sqlite3.Connection):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON;")
+        cursor.execute("PRAGMA journal_mode=WAL;")
+        cursor.execute("PRAGMA synchronous=NORMAL;")
+        cursor.execute("PRAGMA temp_store=MEMORY;")
+        cursor.execute("PRAGMA mmap_size=268435456;")
+        cursor.execute("PRAGMA cache_size=-65536;")
+        # busy timeout comes from connect_args["timeout"] in db.py
         cursor.close()
 
 
@@ -36,24 +68,14 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
-    profile = relationship(
-        "UserProfile",
-        back_populates="user",
-        cascade="all, delete-orphan",
-        passive_deletes=True,
-        uselist=False,
-    )
-    business = relationship(
-        "Business",
-        back_populates="owner",
-        cascade="all, delete-orphan",
-        passive_deletes=True,
-        uselist=False,
-    )
+    # Accounts are removed with a Core DELETE and the FKs' ON DELETE CASCADE does the rest;
+    # "all" keeps the ORM from ever loading or nulling out children on its own.
+    profile = relationship("UserProfile", back_populates="user", passive_deletes="all", uselist=False)
+    business = relationship("Business", back_populates="owner", passive_deletes="all", uselist=False)
 
-    jobs = relationship("Job", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    jobs = relationship("Job", back_populates="user", passive_deletes="all")
 
 
 class UserProfile(Base):
@@ -66,8 +88,8 @@ class UserProfile(Base):
     timezone = Column(String, nullable=True, default="America/New_York")
     default_mileage_rate = Column(Float, nullable=True, default=0.0)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
+    updated_at = Column(UTCDateTime(), server_default=func.now())
 
     user = relationship("User", back_populates="profile")
 
@@ -96,8 +118,8 @@ class Business(Base):
     next_invoice_number = Column(Integer, nullable=False, default=1)
     default_terms = Column(String, nullable=True, default="Due on receipt")
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
+    updated_at = Column(UTCDateTime(), server_default=func.now())
 
     owner = relationship("User", back_populates="business")
 
@@ -108,6 +130,8 @@ class Business(Base):
 
 class Client(Base):
     __tablename__ = "clients"
+    # Listings filter by business and page by id DESC (btree scans backwards just fine)
+    __table_args__ = (Index("ix_clients_biz_id", "business_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -118,7 +142,7 @@ class Client(Base):
     address = Column(String, nullable=True)
     notes = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     business = relationship("Business", back_populates="clients")
     jobs = relationship("Job", back_populates="client")
@@ -126,6 +150,7 @@ class Client(Base):
 
 class Vendor(Base):
     __tablename__ = "vendors"
+    __table_args__ = (Index("ix_vendors_biz_id", "business_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -136,7 +161,7 @@ class Vendor(Base):
     notes = Column(String, nullable=True)
     default_category = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     business = relationship("Business", back_populates="vendors")
     expenses = relationship("Expense", back_populates="vendor")
@@ -144,6 +169,7 @@ class Vendor(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_user_biz_id", "user_id", "business_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -157,7 +183,7 @@ class Job(Base):
     start_date = Column(String, nullable=True)
     end_date = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     user = relationship("User", back_populates="jobs")
     client = relationship("Client", back_populates="jobs")
@@ -170,6 +196,13 @@ class Job(Base):
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_user_biz_id", "user_id", "business_id", "id"),
+        Index(
+            "ix_invoices_created_brin", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -184,14 +217,23 @@ class Invoice(Base):
     invoice_number = Column(String, nullable=True)
     due_date = Column(String, nullable=True)
     pdf_url = Column(String, nullable=True)
+    # pending | ready | failed for the background upload; NULL until a PDF is first requested
+    pdf_status = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     job = relationship("Job", back_populates="invoices")
 
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        Index("ix_expenses_user_biz_id", "user_id", "business_id", "id"),
+        Index(
+            "ix_expenses_created_brin", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -205,7 +247,7 @@ class Expense(Base):
     category_code = Column(String, nullable=True)
     note = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     job = relationship("Job", back_populates="expenses")
     vendor = relationship("Vendor", back_populates="expenses")
@@ -214,6 +256,13 @@ class Expense(Base):
 
 class Mileage(Base):
     __tablename__ = "mileage"
+    __table_args__ = (
+        Index("ix_mileage_user_biz_id", "user_id", "business_id", "id"),
+        Index(
+            "ix_mileage_created_brin", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -224,16 +273,40 @@ class Mileage(Base):
     miles = Column(Float, nullable=False, default=0)
     note = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
     job = relationship("Job", back_populates="mileage_entries")
 
 
 class Receipt(Base):
     __tablename__ = "receipts"
+    # list_receipts filters by owner, optionally job or expense, and orders by id DESC; the
+    # job/expense indexes skip unattached receipts since those filters never match NULL.
+    # The created_at ones serve time-ordered views (BRIN is tiny for append-only tables).
+    # Existing databases get user_id from migrations/0001_receipts_user_id.sql.
+    __table_args__ = (
+        Index("ix_receipts_user_id", "user_id", "id"),
+        Index(
+            "ix_receipts_user_job_id", "user_id", "job_id", "id",
+            postgresql_where=text("job_id IS NOT NULL"),
+            sqlite_where=text("job_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_receipts_user_exp_id", "user_id", "expense_id", "id",
+            postgresql_where=text("expense_id IS NOT NULL"),
+            sqlite_where=text("expense_id IS NOT NULL"),
+        ),
+        Index("ix_receipts_biz_created", "business_id", text("created_at DESC")),
+        Index(
+            "ix_receipts_created_brin", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Denormalized owner (= businesses.owner_user_id) so "my receipts" is a single-column seek
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
 
     job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=True, index=True)
     expense_id = Column(Integer, ForeignKey("expenses.id", ondelete="CASCADE"), nullable=True, index=True)
@@ -246,8 +319,10 @@ class Receipt(Base):
     original_filename = Column(String, nullable=True)
     size_bytes = Column(Integer, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime(), default=_utcnow, server_default=func.now())
 
-    business = relationship("Business", back_populates="receipts")
-    job = relationship("Job", back_populates="receipts")
-    expense = relationship("Expense", back_populates="receipts")
+    # Receipts are read as flat rows; make any accidental per-row relationship load fail loudly
+    # instead of silently turning a listing into N+1 queries.
+    business = relationship("Business", back_populates="receipts", lazy="raise")
+    job = relationship("Job", back_populates="receipts", lazy="raise")
+    expense = relationship("Expense", back_populates="receipts", lazy="raise")
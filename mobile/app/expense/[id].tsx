@@ -3,7 +3,7 @@ import React, { useCallback, useEffect, useMemo, useState } from "react";
 import { Alert, StyleSheet, Text, TextInput, View } from "react-native";
 import { router, useLocalSearchParams } from "expo-router";
 import Screen, { COLORS, SPACING } from "../../components/Screen";
-import { deleteExpense, getExpenses } from "../../lib/api";
+import { deleteExpense, getExpense } from "../../lib/api";
 
 function toNum(v: unknown): number | null {
   if (v == null) return null;
@@ -26,16 +26,15 @@ export default function EditExpenseScreen() {
     if (!id) return;
     setLoading(true);
     try {
-      const all = await getExpenses();
-      const item = (all ?? []).find((x: any) => Number(x.id) === id);
-      if (!item) {
+      const item = await getExpense(id);
+      setAmount(String(item.amount ?? ""));
+      setNote(String(item.note ?? ""));
+    } catch (e: any) {
+      if (e?.status === 404) {
         Alert.alert("Not found", "Expense not found.");
         router.back();
         return;
       }
-      setAmount(String(item.amount ?? ""));
-      setNote(String(item.note ?? ""));
-    } catch (e: any) {
       Alert.alert("Load failed", String(e?.message ?? e));
     } finally {
       setLoading(false);
@@ -6,7 +6,7 @@ import { router, useLocalSearchParams } from "expo-router";
 import Screen, { COLORS, RADIUS, SHADOW, SPACING } from "../../components/Screen";
 import {
   deleteInvoice,
-  getInvoices,
+  getInvoice,
   updateInvoice,
   type Invoice,
 } from "../../lib/api";
@@ -46,20 +46,17 @@ export default function EditInvoiceScreen() {
     setLoading(true);
 
     try {
-      const list = await getInvoices();
-      const found = (list ?? []).find((x: any) => Number(x.id) === invoiceId) ?? null;
-
-      if (!found) {
-        Alert.alert("Not found", "Invoice not found.");
-        router.back();
-        return;
-      }
-
+      const found = await getInvoice(invoiceId);
       setInvoice(found);
       setAmount(String(found.amount ?? ""));
       setNote(String(found.note ?? ""));
       setStatus((String(found.status ?? "unpaid").toLowerCase() as Status) ?? "unpaid");
     } catch (e: any) {
+      if (e?.status === 404) {
+        Alert.alert("Not found", "Invoice not found.");
+        router.back();
+        return;
+      }
       console.log("Invoice load error:", e);
       Alert.alert("Load failed", String(e?.message ?? e));
     } finally {
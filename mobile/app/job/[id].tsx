@@ -6,7 +6,7 @@ import { useFocusEffect, useLocalSearchParams, useRouter } from "expo-router";
 import Screen from "../../components/Screen";
 import { COLORS, SHADOW, SPACING } from "../../lib/ui";
 import type { Job, Invoice, Expense, MileageEntry } from "../../lib/types";
-import { getJobs, getInvoices, getExpenses, getMileage } from "../../lib/api";
+import { getJob, getInvoices, getExpenses, getMileage } from "../../lib/api";
 
 const money = (n: number) => `$${(Number.isFinite(n) ? n : 0).toFixed(2)}`;
 
@@ -46,20 +46,7 @@ export default function JobDetailScreen() {
     }
 
     try {
-      // Jobs endpoint in your app usually returns all jobs,
-      // so we fetch all then find the one we need.
-      const jobs = await getJobs();
-      const found = (Array.isArray(jobs) ? jobs : []).find((j: any) => Number(j?.id) === jobId) ?? null;
-
-      if (!found) {
-        setJob(null);
-        setInvoices([]);
-        setExpenses([]);
-        setMileage([]);
-        setError("Job not found");
-        setLoading(false);
-        return;
-      }
+      const found = await getJob(jobId);
 
       setJob(found);
 
@@ -15,6 +15,16 @@ function withJobId(path: string, jobId?: number | null) {
   return `${path}${join}job_id=${encodeURIComponent(String(jobId))}`;
 }
 
+// Carries the HTTP status so screens can tell "not found" apart from other failures
+export class ApiError extends Error {
+  status: number;
+
+  constructor(message: string, status: number) {
+    super(message);
+    this.status = status;
+  }
+}
+
 export async function request<T>(path: string, method: HttpMethod, body?: unknown): Promise<T> {
   const token = await getToken();
 
@@ -45,7 +55,7 @@ export async function request<T>(path: string, method: HttpMethod, body?: unknow
       (data && (data.detail || data.message)) ||
       (typeof data === "string" ? data : "") ||
       `Request failed (${res.status})`;
-    throw new Error(msg);
+    throw new ApiError(msg, res.status);
   }
 
   return data as T;
@@ -58,6 +68,10 @@ export function getJobs() {
   return request<Job[]>("/jobs", "GET");
 }
 
+export function getJob(jobId: number) {
+  return request<Job>(`/jobs/${jobId}`, "GET");
+}
+
 export function createJob(data: JobCreate): Promise<Job> {
   return request<Job>("/jobs", "POST", data);
 }
@@ -77,6 +91,10 @@ export function getInvoices(jobId?: number | null) {
   return request<Invoice[]>(withJobId("/invoices", jobId), "GET");
 }
 
+export function getInvoice(invoiceId: number) {
+  return request<Invoice>(`/invoices/${invoiceId}`, "GET");
+}
+
 export function createInvoice(data: { job_id?: number | null; amount: number; status?: string; note?: string | null }) {
   return request<Invoice>("/invoices", "POST", data);
 }
@@ -96,6 +114,10 @@ export function getExpenses(jobId?: number | null) {
   return request<Expense[]>(withJobId("/expenses", jobId), "GET");
 }
 
+export function getExpense(expenseId: number) {
+  return request<Expense>(`/expenses/${expenseId}`, "GET");
+}
+
 export function createExpense(data: { job_id?: number | null; amount: number; category: string; note?: string | null }) {
   return request<Expense>("/expenses", "POST", data);
 }
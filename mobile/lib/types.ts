@@ -16,6 +16,8 @@ export type Invoice = {
   amount: number;
   status?: string | null;
   note?: string | null;
+  pdf_url?: string | null;
+  pdf_status?: "pending" | "ready" | "failed" | null;
   created_at?: string;
 };
 